@@ -0,0 +1,127 @@
+import { createHash } from 'crypto';
+import * as fs from 'fs/promises';
+import * as path from 'path';
+import { config } from './config.js';
+
+interface CacheEntry<T> {
+  value: T;
+  storedAt: number;
+}
+
+// Bursts of updates are coalesced into a single rewrite of the cache file
+const FLUSH_DELAY_MS = 1000;
+
+// Every cache created in this process, so pending writes can be flushed before exiting
+const openCaches = new Set<{ flush(): Promise<void> }>();
+
+export async function flushCaches(): Promise<void> {
+  await Promise.all([...openCaches].map((cache) => cache.flush()));
+}
+
+export interface FileCacheOptions {
+  ttlMs: number;
+  maxEntries: number;
+  // Ignore stored entries but still save new ones, so a rerun can ask for fresh results
+  refresh?: boolean;
+}
+
+export class FileCache<T> {
+  private filePath: string;
+  private entries?: Promise<Map<string, CacheEntry<T>>>;
+  private pendingWrite: Promise<void> = Promise.resolve();
+  private flushTimer?: NodeJS.Timeout;
+
+  constructor(
+    name: string,
+    private options: FileCacheOptions
+  ) {
+    this.filePath = path.join(config.cacheDir, `${name}.json`);
+    openCaches.add(this);
+  }
+
+  static key(...parts: string[]): string {
+    const hash = createHash('sha256');
+    for (const part of parts) {
+      hash.update(part);
+      hash.update('\0');
+    }
+    return hash.digest('hex');
+  }
+
+  async get(key: string): Promise<T | undefined> {
+    if (this.options.refresh) {
+      return undefined;
+    }
+    const entries = await this.load();
+    const entry = entries.get(key);
+    if (!entry) {
+      return undefined;
+    }
+    if (Date.now() - entry.storedAt > this.options.ttlMs) {
+      entries.delete(key);
+      return undefined;
+    }
+    return entry.value;
+  }
+
+  async set(key: string, value: T): Promise<void> {
+    const entries = await this.load();
+    entries.delete(key);
+    entries.set(key, { value, storedAt: Date.now() });
+
+    // Map iteration follows insertion order, so the oldest entries go first
+    while (entries.size > this.options.maxEntries) {
+      entries.delete(entries.keys().next().value!);
+    }
+
+    // Persist in the background; callers only pay for the in-memory update
+    if (!this.flushTimer) {
+      this.flushTimer = setTimeout(() => this.startSave(entries), FLUSH_DELAY_MS);
+    }
+  }
+
+  // Write out any buffered changes now and wait for all writes to finish
+  async flush(): Promise<void> {
+    if (this.flushTimer) {
+      clearTimeout(this.flushTimer);
+      this.startSave(await this.load());
+    }
+    await this.pendingWrite;
+  }
+
+  private startSave(entries: Map<string, CacheEntry<T>>): void {
+    this.flushTimer = undefined;
+    // Serialize writes so flushes never interleave on the same file
+    this.pendingWrite = this.pendingWrite.then(() => this.save(entries));
+  }
+
+  private load(): Promise<Map<string, CacheEntry<T>>> {
+    if (!this.entries) {
+      this.entries = fs
+        .readFile(this.filePath, 'utf-8')
+        .then((text) => {
+          const now = Date.now();
+          const stored = Object.entries(JSON.parse(text) as Record<string, CacheEntry<T>>);
+          return new Map(stored.filter(([, entry]) => now - entry.storedAt <= this.options.ttlMs));
+        })
+        .catch(() => new Map<string, CacheEntry<T>>());
+    }
+    return this.entries;
+  }
+
+  private async save(entries: Map<string, CacheEntry<T>>): Promise<void> {
+    const tmpPath = `${this.filePath}.${process.pid}.tmp`;
+    try {
+      // Entries hold private repository content, so keep them readable by the owner only
+      await fs.mkdir(path.dirname(this.filePath), { recursive: true, mode: 0o700 });
+      await fs.writeFile(tmpPath, JSON.stringify(Object.fromEntries(entries)), {
+        encoding: 'utf-8',
+        mode: 0o600,
+      });
+      await fs.rename(tmpPath, this.filePath);
+    } catch {
+      // ignore cache write error; the cache is only an optimization
+      await fs.rm(tmpPath, { force: true }).catch(() => {});
+    }
+  }
+}
@@ -1,13 +1,39 @@
 import * as fs from 'fs/promises';
 import * as path from 'path';
+import { FileCache } from './cache.js';
 import type { AIModel } from './models/index.js';
-import type { FixResult, PRContext } from './types.js';
+import type { AnalysisResult, FixRequest, FixResult, PRContext } from './types.js';
+
+// Upper bound on review comments sent to the model in a single fix prompt
+const MAX_COMMENTS_PER_FIX = 10;
+
+const FIX_CACHE_TTL_MS = 7 * 24 * 60 * 60 * 1000;
+const FIX_CACHE_MAX_ENTRIES = 100;
+const ANALYSIS_CACHE_MAX_ENTRIES = 500;
 
 export class CodeModifier {
+  // Latest known content per file for this run; every write goes through it
+  private contentCache = new Map<string, string>();
+  // Generated fixes keyed by a hash of everything that goes into the prompt
+  private fixCache: FileCache<string>;
+  private analysisCache: FileCache<AnalysisResult>;
+
   constructor(
     private model: AIModel,
-    private repoPath: string
-  ) {}
+    private repoPath: string,
+    refreshCache = false
+  ) {
+    this.fixCache = new FileCache<string>('fixes', {
+      ttlMs: FIX_CACHE_TTL_MS,
+      maxEntries: FIX_CACHE_MAX_ENTRIES,
+      refresh: refreshCache,
+    });
+    this.analysisCache = new FileCache<AnalysisResult>('analyses', {
+      ttlMs: FIX_CACHE_TTL_MS,
+      maxEntries: ANALYSIS_CACHE_MAX_ENTRIES,
+      refresh: refreshCache,
+    });
+  }
 
   async applyFix(
     filePath: string,
@@ -15,80 +41,163 @@ export class CodeModifier {
     prContext: PRContext,
     lineNumber?: number
   ): Promise<FixResult> {
+    const [result] = await this.applyFixes(filePath, [{ reviewComment, lineNumber }], prContext);
+    return result;
+  }
+
+  async applyFixes(
+    filePath: string,
+    requests: FixRequest[],
+    prContext: PRContext
+  ): Promise<FixResult[]> {
     const fullPath = path.join(this.repoPath, filePath);
 
-    // Check if file exists
+    // Read current file content (a missing file surfaces as ENOENT)
+    let currentContent = this.contentCache.get(fullPath);
     try {
-      await fs.access(fullPath);
-    } catch {
-      return {
-        success: false,
-        filePath,
-        changesMade: '',
-        error: `File not found: ${filePath}`,
-      };
+      if (currentContent === undefined) {
+        currentContent = await fs.readFile(fullPath, 'utf-8');
+        this.contentCache.set(fullPath, currentContent);
+      }
+    } catch (e) {
+      const error =
+        (e as NodeJS.ErrnoException).code === 'ENOENT'
+          ? `File not found: ${filePath}`
+          : `Failed to read file: ${e}`;
+      return requests.map(() => ({ success: false, filePath, changesMade: '', error }));
     }
 
-    // Read current file content
-    let currentContent: string;
-    try {
-      currentContent = await fs.readFile(fullPath, 'utf-8');
-    } catch (e) {
-      return {
-        success: false,
-        filePath,
-        changesMade: '',
-        error: `Failed to read file: ${e}`,
-      };
+    const results = new Array<FixResult>(requests.length);
+    const analyses = new Array<AnalysisResult>(requests.length);
+    const pending: number[] = [];
+
+    // Analyze what needs to be done for each comment. This runs one call at a time
+    // because the caller already bounds how many files are fixed concurrently
+    for (let idx = 0; idx < requests.length; idx++) {
+      let analysis: AnalysisResult;
+      try {
+        analysis = await this.analyze(currentContent, filePath, requests[idx].reviewComment, prContext);
+      } catch (e) {
+        results[idx] = {
+          success: false,
+          filePath,
+          changesMade: '',
+          error: `Failed to analyze review: ${e}`,
+        };
+        continue;
+      }
+
+      analyses[idx] = analysis;
+      if (analysis.action === 'no_action') {
+        results[idx] = {
+          success: true,
+          filePath,
+          changesMade: 'No changes needed',
+          reasoning: analysis.reasoning,
+        };
+      } else {
+        pending.push(idx);
+      }
+    }
+
+    // Generate fixed code, one model call per chunk of comments on this file
+    for (let start = 0; start < pending.length; start += MAX_COMMENTS_PER_FIX) {
+      const chunk = pending.slice(start, start + MAX_COMMENTS_PER_FIX);
+
+      try {
+        // Keyed on the pre-fix content, so this only hits when the same content and comments
+        // come back, e.g. a rerun after reverting the fixed files. After a failed push the
+        // fixes are already committed, the content differs and the lookup misses
+        const cacheKey = FileCache.key(
+          this.model.name,
+          this.model.promptVersion,
+          filePath,
+          currentContent,
+          ...chunk.map((idx) => `${requests[idx].lineNumber ?? ''}:${requests[idx].reviewComment}`)
+        );
+
+        let fixedContent = await this.fixCache.get(cacheKey);
+        if (!fixedContent?.trim()) {
+          fixedContent =
+            chunk.length === 1
+              ? await this.model.generateCodeFix(
+                  currentContent,
+                  filePath,
+                  requests[chunk[0]].reviewComment,
+                  requests[chunk[0]].lineNumber
+                )
+              : await this.model.generateCodeFixBatch(
+                  currentContent,
+                  filePath,
+                  chunk.map((idx) => requests[idx])
+                );
+          // A blocked or empty response would truncate the file, so it is never used or kept
+          if (!fixedContent.trim()) {
+            throw new Error('AI model returned an empty response');
+          }
+          await this.fixCache.set(cacheKey, fixedContent);
+        }
+
+        // Write fixed content back to file
+        await fs.writeFile(fullPath, fixedContent, 'utf-8');
+        this.contentCache.set(fullPath, fixedContent);
+        currentContent = fixedContent;
+
+        for (const idx of chunk) {
+          results[idx] = {
+            success: true,
+            filePath,
+            changesMade: summarizeChanges(analyses[idx]),
+            reasoning: analyses[idx].reasoning,
+          };
+        }
+      } catch (e) {
+        for (const idx of chunk) {
+          results[idx] = {
+            success: false,
+            filePath,
+            changesMade: '',
+            error: `Failed to apply fix: ${e}`,
+          };
+        }
+      }
     }
 
-    // Analyze what needs to be done
-    const analysis = await this.model.analyzeReview(
-      currentContent,
+    return results;
+  }
+
+  private async analyze(
+    fileContent: string,
+    filePath: string,
+    reviewComment: string,
+    prContext: PRContext
+  ): Promise<AnalysisResult> {
+    const cacheKey = FileCache.key(
+      this.model.name,
+      this.model.promptVersion,
       filePath,
+      fileContent,
       reviewComment,
-      prContext
+      prContext.title,
+      prContext.description
     );
 
-    if (analysis.action === 'no_action') {
-      return {
-        success: true,
-        filePath,
-        changesMade: 'No changes needed',
-        reasoning: analysis.reasoning,
-      };
-    }
-
-    // Generate fixed code
-    try {
-      const fixedContent = await this.model.generateCodeFix(
-        currentContent,
-        filePath,
-        reviewComment,
-        lineNumber
-      );
-
-      // Write fixed content back to file
-      await fs.writeFile(fullPath, fixedContent, 'utf-8');
-
-      let changesSummary = `Applied fix: ${analysis.reasoning}`;
-      if (analysis.changes.length > 0) {
-        changesSummary += '\n- ' + analysis.changes.join('\n- ');
+    let analysis = await this.analysisCache.get(cacheKey);
+    if (!analysis) {
+      analysis = await this.model.analyzeReview(fileContent, filePath, reviewComment, prContext);
+      // no_action is also the fallback for an unparseable response, so it is never kept
+      if (analysis.action !== 'no_action') {
+        await this.analysisCache.set(cacheKey, analysis);
       }
-
-      return {
-        success: true,
-        filePath,
-        changesMade: changesSummary,
-        reasoning: analysis.reasoning,
-      };
-    } catch (e) {
-      return {
-        success: false,
-        filePath,
-        changesMade: '',
-        error: `Failed to apply fix: ${e}`,
-      };
     }
+    return analysis;
+  }
+}
+
+function summarizeChanges(analysis: AnalysisResult): string {
+  let changesSummary = `Applied fix: ${analysis.reasoning}`;
+  if (analysis.changes.length > 0) {
+    changesSummary += '\n- ' + analysis.changes.join('\n- ');
   }
+  return changesSummary;
 }
@@ -1,6 +1,17 @@
 import 'dotenv/config';
+import * as os from 'os';
+import * as path from 'path';
 
-export const config = {
+function parsePositiveInt(value: string | undefined, fallback: number): number {
+  const parsed = parseInt(value || '', 10);
+  return parsed > 0 ? parsed : fallback;
+}
+
+export const MODEL_NAMES = ['gemini'] as const;
+export type ModelName = (typeof MODEL_NAMES)[number];
+
+// Environment variables are read once at startup; the result is immutable
+export const config = Object.freeze({
   // GitHub
   githubToken: process.env.GITHUB_TOKEN || '',
 
@@ -10,13 +21,28 @@ export const config = {
 
   // Model Selection
   defaultModel: process.env.DEFAULT_MODEL || 'gemini',
-};
+
+  // Concurrent AI calls (review: per file, fix: per file)
+  reviewConcurrency: parsePositiveInt(process.env.REVIEW_CONCURRENCY, 16),
+  fixConcurrency: parsePositiveInt(process.env.FIX_CONCURRENCY, 5),
+
+  // Local cache for AI results
+  cacheDir: process.env.CACHE_DIR || path.join(os.homedir(), '.cache', 'pr-auto-reviewer'),
+});
+
+export function isModelName(name: string): name is ModelName {
+  return (MODEL_NAMES as readonly string[]).includes(name);
+}
 
 export function validateConfig(): void {
   if (!config.githubToken) {
     throw new Error('GITHUB_TOKEN is required');
   }
 
+  if (!isModelName(config.defaultModel)) {
+    throw new Error(`Unknown model: ${config.defaultModel}`);
+  }
+
   if (config.defaultModel === 'gemini' && !config.vertexProjectId) {
     throw new Error('VERTEX_AI_PROJECT_ID is required for Gemini model');
   }
@@ -1,16 +1,84 @@
-import { Octokit } from 'octokit';
+import { Octokit, RequestError } from 'octokit';
+import { FileCache } from './cache.js';
 import { config } from './config.js';
+import type { PatchIndex } from './patch-index.js';
 import type { PRContext, ReviewComment, PRFile, ReviewSuggestion } from './types.js';
 
+type PullRequestData = Awaited<ReturnType<Octokit['rest']['pulls']['get']>>['data'];
+
+// PR metadata changes on push, so it is only reused for a short window
+const PULL_CACHE_TTL_MS = 10_000;
+// File content at a fixed commit SHA never changes; the size cap bounds memory
+const FILE_CACHE_MAX_ENTRIES = 512;
+
+// Conditional GETs: a 304 reply is served from here and costs no rate limit
+const ETAG_CACHE_TTL_MS = 24 * 60 * 60 * 1000;
+const ETAG_CACHE_MAX_ENTRIES = 500;
+
+const PR_URL_RE = /github\.com\/([^/]+)\/([^/]+)\/pull\/(\d+)/;
+
+interface CachedResponse {
+  etag: string;
+  url: string;
+  headers: Record<string, unknown>;
+  data: unknown;
+}
+
 export class GitHubClient {
   private octokit: Octokit;
+  private pullCache = new Map<string, { expiresAt: number; request: Promise<PullRequestData> }>();
+  private fileCache = new Map<string, string>();
+  private etagCache = new FileCache<CachedResponse>('etags', {
+    ttlMs: ETAG_CACHE_TTL_MS,
+    maxEntries: ETAG_CACHE_MAX_ENTRIES,
+  });
 
   constructor() {
     this.octokit = new Octokit({ auth: config.githubToken });
+
+    this.octokit.hook.wrap('request', async (request, options) => {
+      if (options.method !== 'GET') {
+        return request(options);
+      }
+
+      // The Accept header is part of the key: raw and JSON bodies differ for the same URL
+      const { url, headers } = request.endpoint(options);
+      const key = FileCache.key(url, String(headers.accept ?? ''));
+      const cached = await this.etagCache.get(key);
+
+      if (cached) {
+        options.headers = { ...options.headers, 'if-none-match': cached.etag };
+      }
+
+      try {
+        const response = await request(options);
+        const etag = response.headers.etag;
+        // Raw file bodies are large and already cached in memory per commit SHA
+        if (etag && typeof response.data === 'object' && !(response.data instanceof ArrayBuffer)) {
+          await this.etagCache.set(key, {
+            etag,
+            url: response.url,
+            headers: { ...response.headers },
+            data: response.data,
+          });
+        }
+        return response;
+      } catch (e) {
+        if (cached && e instanceof RequestError && e.status === 304) {
+          return {
+            status: 200,
+            url: cached.url,
+            headers: cached.headers,
+            data: cached.data,
+          } as Awaited<ReturnType<typeof request>>;
+        }
+        throw e;
+      }
+    });
   }
 
   parsePrUrl(prUrl: string): { owner: string; repo: string; prNumber: number } {
-    const match = prUrl.match(/github\.com\/([^/]+)\/([^/]+)\/pull\/(\d+)/);
+    const match = PR_URL_RE.exec(prUrl);
     if (!match) {
       throw new Error(`Invalid PR URL: ${prUrl}`);
     }
@@ -23,14 +91,34 @@ export class GitHubClient {
 
   async getPullRequest(prUrl: string) {
     const { owner, repo, prNumber } = this.parsePrUrl(prUrl);
-    const { data } = await this.octokit.rest.pulls.get({
-      owner,
-      repo,
-      pull_number: prNumber,
-    });
+    const key = `${owner}/${repo}#${prNumber}`;
+
+    const cached = this.pullCache.get(key);
+    let request = cached && cached.expiresAt > Date.now() ? cached.request : undefined;
+
+    if (!request) {
+      request = this.octokit.rest.pulls
+        .get({ owner, repo, pull_number: prNumber })
+        .then(({ data }) => data);
+      const entry = { expiresAt: Date.now() + PULL_CACHE_TTL_MS, request };
+      this.pullCache.set(key, entry);
+      // Never keep a failed lookup around
+      request.catch(() => {
+        if (this.pullCache.get(key) === entry) {
+          this.pullCache.delete(key);
+        }
+      });
+    }
+
+    const data = await request;
     return { data, owner, repo, prNumber };
   }
 
+  invalidate(prUrl: string): void {
+    const { owner, repo, prNumber } = this.parsePrUrl(prUrl);
+    this.pullCache.delete(`${owner}/${repo}#${prNumber}`);
+  }
+
   async getPrContext(prUrl: string): Promise<PRContext> {
     const { data } = await this.getPullRequest(prUrl);
     return {
@@ -44,39 +132,78 @@ export class GitHubClient {
     };
   }
 
-  async getReviewComments(prUrl: string): Promise<ReviewComment[]> {
+  async *iterReviewComments(prUrl: string): AsyncGenerator<ReviewComment> {
     const { owner, repo, prNumber } = this.parsePrUrl(prUrl);
-    const { data } = await this.octokit.rest.pulls.listReviewComments({
+    const pages = this.octokit.paginate.iterator(this.octokit.rest.pulls.listReviewComments, {
       owner,
       repo,
       pull_number: prNumber,
+      per_page: 100,
     });
 
-    return data.map((comment) => ({
-      id: comment.id,
-      body: comment.body,
-      path: comment.path,
-      position: comment.position ?? null,
-      line: comment.line ?? null,
-      originalLine: comment.original_line ?? null,
-      commitId: comment.commit_id,
-      user: comment.user?.login || 'unknown',
-      createdAt: new Date(comment.created_at),
-      inReplyToId: comment.in_reply_to_id ?? null,
-    }));
+    // Yield each page as it arrives instead of waiting for the last one
+    for await (const { data } of pages) {
+      for (const comment of data) {
+        yield {
+          id: comment.id,
+          body: comment.body,
+          path: comment.path,
+          position: comment.position ?? null,
+          line: comment.line ?? null,
+          originalLine: comment.original_line ?? null,
+          commitId: comment.commit_id,
+          user: comment.user?.login || 'unknown',
+          createdAt: new Date(comment.created_at),
+          inReplyToId: comment.in_reply_to_id ?? null,
+        };
+      }
+    }
+  }
+
+  async getReviewComments(prUrl: string): Promise<ReviewComment[]> {
+    const comments: ReviewComment[] = [];
+    for await (const comment of this.iterReviewComments(prUrl)) {
+      comments.push(comment);
+    }
+    return comments;
   }
 
   async getFileContent(prUrl: string, filePath: string): Promise<string> {
     const { owner, repo, data: pr } = await this.getPullRequest(prUrl);
+    const key = `${owner}/${repo}@${pr.head.sha}:${filePath}`;
+
+    const cached = this.fileCache.get(key);
+    if (cached !== undefined) {
+      // Re-insert to keep the most recently used entries at the end
+      this.fileCache.delete(key);
+      this.fileCache.set(key, cached);
+      return cached;
+    }
+
+    // The raw media type returns the file body directly instead of base64-encoded JSON
     const { data } = await this.octokit.rest.repos.getContent({
       owner,
       repo,
       path: filePath,
       ref: pr.head.sha,
+      mediaType: { format: 'raw' },
     });
 
-    if ('content' in data && data.content) {
-      return Buffer.from(data.content, 'base64').toString('utf-8');
+    // Octokit yields a string for text responses and an ArrayBuffer otherwise
+    const raw: unknown = data;
+    const content =
+      typeof raw === 'string'
+        ? raw
+        : raw instanceof ArrayBuffer
+          ? Buffer.from(raw).toString('utf-8')
+          : undefined;
+
+    if (content !== undefined) {
+      this.fileCache.set(key, content);
+      if (this.fileCache.size > FILE_CACHE_MAX_ENTRIES) {
+        this.fileCache.delete(this.fileCache.keys().next().value!);
+      }
+      return content;
     }
     throw new Error(`Could not fetch file ${filePath}`);
   }
@@ -96,37 +223,64 @@ export class GitHubClient {
     });
   }
 
-  async getPrFiles(prUrl: string): Promise<PRFile[]> {
+  async *iterPrFiles(prUrl: string): AsyncGenerator<PRFile> {
     const { owner, repo, prNumber } = this.parsePrUrl(prUrl);
-    const { data } = await this.octokit.rest.pulls.listFiles({
+    const pages = this.octokit.paginate.iterator(this.octokit.rest.pulls.listFiles, {
       owner,
       repo,
       pull_number: prNumber,
+      per_page: 100,
     });
 
-    return data.map((file) => ({
-      filename: file.filename,
-      status: file.status,
-      additions: file.additions,
-      deletions: file.deletions,
-      changes: file.changes,
-      patch: file.patch,
-      contentsUrl: file.contents_url,
-    }));
+    for await (const { data } of pages) {
+      for (const file of data) {
+        yield {
+          filename: file.filename,
+          status: file.status,
+          additions: file.additions,
+          deletions: file.deletions,
+          changes: file.changes,
+          patch: file.patch,
+          contentsUrl: file.contents_url,
+        };
+      }
+    }
+  }
+
+  async getPrFiles(prUrl: string): Promise<PRFile[]> {
+    const files: PRFile[] = [];
+    for await (const file of this.iterPrFiles(prUrl)) {
+      files.push(file);
+    }
+    return files;
   }
 
   async createReview(
     prUrl: string,
     comments: ReviewSuggestion[],
-    body?: string
-  ): Promise<void> {
-    const { owner, repo, prNumber, data: pr } = await this.getPullRequest(prUrl);
+    body?: string,
+    patchIndex?: PatchIndex
+  ): Promise<ReviewSuggestion[]> {
+    // GitHub rejects the whole review if any comment targets a line outside the diff
+    const validComments: ReviewSuggestion[] = [];
+    const skippedComments: ReviewSuggestion[] = [];
 
-    if (comments.length === 0 && !body) {
-      return;
+    for (const c of comments) {
+      if (!patchIndex || (c.side || 'RIGHT') !== 'RIGHT' || patchIndex.isValidLine(c.path, c.line)) {
+        validComments.push(c);
+      } else {
+        skippedComments.push(c);
+      }
     }
 
-    const reviewComments = comments.map((c) => ({
+    // Nothing to post: skip the PR lookup entirely
+    if (validComments.length === 0 && !body) {
+      return skippedComments;
+    }
+
+    const { owner, repo, prNumber, data: pr } = await this.getPullRequest(prUrl);
+
+    const reviewComments = validComments.map((c) => ({
       path: c.path,
       line: c.line,
       body: c.body,
@@ -142,5 +296,7 @@ export class GitHubClient {
       event: 'COMMENT',
       comments: reviewComments,
     });
+
+    return skippedComments;
   }
 }
@@ -10,8 +10,24 @@ import { GitHubClient } from './github-client.js';
 import { getModel } from './models/index.js';
 import { CodeModifier } from './code-modifier.js';
 import { GitOperations } from './git-ops.js';
+import { FileCache, flushCaches } from './cache.js';
+import { mapConcurrent } from './concurrency.js';
+import { PatchIndex } from './patch-index.js';
 import type { ReviewComment, PendingReply, FixResult, ReviewSuggestion } from './types.js';
 
+const REVIEW_CACHE_TTL_MS = 7 * 24 * 60 * 60 * 1000;
+const REVIEW_CACHE_MAX_ENTRIES = 500;
+
+interface ReviewOutcome {
+  suggestions: ReviewSuggestion[];
+  error?: unknown;
+}
+
+interface ReplyOutcome {
+  reply?: string;
+  error?: unknown;
+}
+
 const program = new Command();
 
 program
@@ -24,6 +40,7 @@ program
   .description('AI reviews PR code and posts review comments')
   .argument('<pr-url>', 'GitHub Pull Request URL')
   .option('--dry-run', 'Show what would be done without making changes')
+  .option('--no-cache', 'Ignore cached AI results and ask the model again')
   .showHelpAfterError(true)
   .action(async (prUrl: string, options) => {
     await runReviewMode(prUrl, options);
@@ -36,12 +53,13 @@ program
   .option('--repo-path <path>', 'Path to local repository', '.')
   .option('--dry-run', 'Show what would be done without making changes')
   .option('--no-auto-reply', 'Disable automatic replies to comments')
+  .option('--no-cache', 'Ignore cached AI results and ask the model again')
   .showHelpAfterError(true)
   .action(async (prUrl: string, options) => {
     await runFixMode(prUrl, options);
   });
 
-async function runReviewMode(prUrl: string, options: { dryRun?: boolean }) {
+async function runReviewMode(prUrl: string, options: { dryRun?: boolean; cache?: boolean }) {
   console.log(chalk.cyan.bold('\n🔍 PR Auto Reviewer - Review Mode\n'));
 
   try {
@@ -49,7 +67,7 @@ async function runReviewMode(prUrl: string, options: { dryRun?: boolean }) {
     console.log(chalk.bold(`Using AI model: ${config.defaultModel}`));
 
     const githubClient = new GitHubClient();
-    const aiModel = getModel();
+    const aiModel = await getModel();
 
     // Get PR information
     const spinner = ora('Fetching PR information...').start();
@@ -65,6 +83,7 @@ async function runReviewMode(prUrl: string, options: { dryRun?: boolean }) {
     spinner.succeed('PR files fetched');
 
     const reviewableFiles = files.filter((f) => f.patch && f.status !== 'removed');
+    const patchIndex = PatchIndex.fromFiles(reviewableFiles);
     console.log(chalk.bold(`\nFound ${reviewableFiles.length} file(s) to review\n`));
 
     if (reviewableFiles.length === 0) {
@@ -118,18 +137,65 @@ async function runReviewMode(prUrl: string, options: { dryRun?: boolean }) {
 
     console.log(chalk.bold(`\n${selectedFiles.length}개의 파일을 리뷰합니다.\n`));
 
-    // Review each file
+    // Review files concurrently, then print results in the original order
+    let reviewedCount = 0;
+    spinner.start(`AI가 코드를 분석중... (0/${selectedFiles.length})`);
+
+    // Reruns over an unchanged diff reuse earlier results instead of calling the model
+    const reviewCache = new FileCache<ReviewSuggestion[]>('reviews', {
+      ttlMs: REVIEW_CACHE_TTL_MS,
+      maxEntries: REVIEW_CACHE_MAX_ENTRIES,
+      refresh: options.cache === false,
+    });
+
+    const reviews = await mapConcurrent(
+      selectedFiles,
+      config.reviewConcurrency,
+      async (file): Promise<ReviewOutcome> => {
+        // A failed call (e.g. rate limited) only costs this file, not the whole run
+        let outcome: ReviewOutcome;
+        try {
+          const cacheKey = FileCache.key(
+            aiModel.name,
+            aiModel.promptVersion,
+            file.filename,
+            file.patch!,
+            prContext.title,
+            prContext.description
+          );
+
+          let suggestions = await reviewCache.get(cacheKey);
+          if (!suggestions) {
+            suggestions = await aiModel.reviewCode(file.filename, file.patch!, prContext);
+            // An empty result may be an unparseable response, so only real feedback is kept
+            if (suggestions.length > 0) {
+              await reviewCache.set(cacheKey, suggestions);
+            }
+          }
+          outcome = { suggestions };
+        } catch (e) {
+          outcome = { suggestions: [], error: e };
+        }
+
+        reviewedCount++;
+        spinner.text = `AI가 코드를 분석중... (${reviewedCount}/${selectedFiles.length})`;
+        return outcome;
+      }
+    );
+    spinner.stop();
+
     const allSuggestions: ReviewSuggestion[] = [];
+    const failedFiles: string[] = [];
 
     for (let idx = 0; idx < selectedFiles.length; idx++) {
       const file = selectedFiles[idx];
+      const { suggestions, error } = reviews[idx];
       console.log(chalk.cyan.bold(`[${idx + 1}/${selectedFiles.length}] ${file.filename}`));
 
-      spinner.start('AI가 코드를 분석중...');
-      const suggestions = await aiModel.reviewCode(file.filename, file.patch!, prContext);
-      spinner.stop();
-
-      if (suggestions.length > 0) {
+      if (error) {
+        console.log(chalk.red(`  ✗ 리뷰 실패: ${error}`));
+        failedFiles.push(file.filename);
+      } else if (suggestions.length > 0) {
         console.log(chalk.green(`  ✓ ${suggestions.length}개의 피드백 생성됨`));
         suggestions.forEach((s) => {
           console.log(chalk.dim(`    - Line ${s.line}: ${s.body.slice(0, 50)}...`));
@@ -142,8 +208,17 @@ async function runReviewMode(prUrl: string, options: { dryRun?: boolean }) {
 
     console.log('\n' + '='.repeat(50));
 
+    if (failedFiles.length > 0) {
+      console.log(chalk.yellow(`\n⚠ ${failedFiles.length}개 파일의 리뷰에 실패했습니다:`));
+      failedFiles.forEach((f) => console.log(chalk.dim(`    - ${f}`)));
+    }
+
     if (allSuggestions.length === 0) {
-      console.log(chalk.green('\n모든 코드가 깨끗합니다! 리뷰 코멘트가 없습니다.\n'));
+      if (failedFiles.length === 0) {
+        console.log(chalk.green('\n모든 코드가 깨끗합니다! 리뷰 코멘트가 없습니다.\n'));
+      } else {
+        console.log(chalk.yellow('\n게시할 리뷰 코멘트가 없습니다.\n'));
+      }
       return;
     }
 
@@ -174,9 +249,23 @@ async function runReviewMode(prUrl: string, options: { dryRun?: boolean }) {
 
     // Post review
     spinner.start('리뷰를 게시중...');
+    let postedCount = 0;
     try {
-      await githubClient.createReview(prUrl, allSuggestions);
-      spinner.succeed('리뷰가 게시되었습니다!');
+      const skipped = await githubClient.createReview(prUrl, allSuggestions, undefined, patchIndex);
+      postedCount = allSuggestions.length - skipped.length;
+      if (postedCount === 0) {
+        // createReview posts nothing when every comment falls outside the diff
+        spinner.warn('게시할 수 있는 리뷰 코멘트가 없어 리뷰를 게시하지 않았습니다.');
+      } else {
+        spinner.succeed('리뷰가 게시되었습니다!');
+      }
+
+      if (skipped.length > 0) {
+        console.log(chalk.yellow(`⚠ diff 범위 밖의 라인을 가리키는 코멘트 ${skipped.length}개는 건너뛰었습니다.`));
+        skipped.forEach((s) => {
+          console.log(chalk.dim(`    - ${s.path}:${s.line}`));
+        });
+      }
     } catch (e) {
       spinner.fail('리뷰 게시 실패');
       console.error(chalk.red(`Error: ${e}`));
@@ -185,18 +274,23 @@ async function runReviewMode(prUrl: string, options: { dryRun?: boolean }) {
     // Summary
     console.log('\n' + '='.repeat(50));
     console.log(chalk.cyan.bold('Summary\n'));
-    console.log(chalk.green(`Files reviewed: ${selectedFiles.length}`));
-    console.log(chalk.green(`Comments posted: ${allSuggestions.length}`));
+    console.log(chalk.green(`Files reviewed: ${selectedFiles.length - failedFiles.length}`));
+    if (failedFiles.length > 0) {
+      console.log(chalk.red(`Files failed: ${failedFiles.length}`));
+    }
+    console.log(chalk.green(`Comments posted: ${postedCount}`));
   } catch (e) {
     console.error(chalk.red(`\nError: ${e}`));
     console.log();
+    // program.help() exits the process, so write out pending cache entries first
+    await flushCaches();
     program.help();
   }
 }
 
 async function runFixMode(
   prUrl: string,
-  options: { repoPath: string; dryRun?: boolean; autoReply?: boolean }
+  options: { repoPath: string; dryRun?: boolean; autoReply?: boolean; cache?: boolean }
 ) {
   console.log(chalk.cyan.bold('\n🔧 PR Auto Reviewer - Fix Mode\n'));
 
@@ -208,8 +302,8 @@ async function runFixMode(
 
     // Initialize components
     const githubClient = new GitHubClient();
-    const aiModel = getModel();
-    const codeModifier = new CodeModifier(aiModel, options.repoPath);
+    const aiModel = await getModel();
+    const codeModifier = new CodeModifier(aiModel, options.repoPath, options.cache === false);
     const gitOps = new GitOperations(options.repoPath);
 
     // Get PR information
@@ -236,10 +330,8 @@ async function runFixMode(
     console.log(chalk.bold('리뷰 코멘트 목록:\n'));
 
     comments.forEach((comment, idx) => {
-      const preview = comment.body.split('\n')[0].slice(0, 80);
-      const ellipsis = comment.body.split('\n')[0].length > 80 ? '...' : '';
       console.log(`  ${idx + 1}. [${comment.user}] ${comment.path}:${comment.line || '?'}`);
-      console.log(chalk.dim(`     ${preview}${ellipsis}`));
+      console.log(chalk.dim(`     ${firstLinePreview(comment.body, 80)}`));
     });
 
     console.log();
@@ -265,10 +357,8 @@ async function runFixMode(
       selectedComments = comments;
     } else {
       const choices = comments.map((comment, idx) => {
-        const preview = comment.body.split('\n')[0].slice(0, 60);
-        const ellipsis = comment.body.split('\n')[0].length > 60 ? '...' : '';
         return {
-          name: `[${comment.user}] ${comment.path}:${comment.line || '?'} - ${preview}${ellipsis}`,
+          name: `[${comment.user}] ${comment.path}:${comment.line || '?'} - ${firstLinePreview(comment.body, 60)}`,
           value: idx,
         };
       });
@@ -289,65 +379,153 @@ async function runFixMode(
     console.log(chalk.bold(`\n${selectedComments.length}개의 코멘트가 선택되었습니다.\n`));
 
     // Process each comment
-    const modifiedFiles: string[] = [];
+    // Insertion-ordered and unique, ready to stage as-is
+    const modifiedFiles = new Set<string>();
     const results: FixResult[] = [];
     const pendingReplies: PendingReply[] = [];
 
-    for (let idx = 0; idx < selectedComments.length; idx++) {
-      const comment = selectedComments[idx];
-      console.log(chalk.cyan.bold(`Comment ${idx + 1}/${selectedComments.length}`));
-      console.log(chalk.bold(`File: ${comment.path}`));
-      console.log(chalk.bold(`Line: ${comment.line || '?'}`));
-      console.log(chalk.bold(`Comment: ${comment.body.slice(0, 100)}...`));
+    // Group comments by file so each file gets a single fix pass
+    const commentsByFile = new Map<string, ReviewComment[]>();
+    for (const comment of selectedComments) {
+      const group = commentsByFile.get(comment.path);
+      if (group) {
+        group.push(comment);
+      } else {
+        commentsByFile.set(comment.path, [comment]);
+      }
+    }
 
-      if (options.dryRun) {
+    const fileGroups = [...commentsByFile];
+    // Output is grouped by file; each comment keeps its number from the selection list
+    const selectionNumber = new Map(selectedComments.map((c, idx) => [c, idx + 1]));
+
+    if (options.dryRun) {
+      for (const [filePath, fileComments] of fileGroups) {
+        console.log(chalk.cyan.bold(`File: ${filePath} (${fileComments.length} comment(s))`));
+        for (const comment of fileComments) {
+          console.log(
+            chalk.bold(`Comment ${selectionNumber.get(comment)}/${selectedComments.length}`)
+          );
+          console.log(chalk.bold(`Line: ${comment.line || '?'}`));
+          console.log(chalk.bold(`Comment: ${comment.body.slice(0, 100)}...`));
+        }
         console.log(chalk.yellow('Dry run mode - skipping actual changes\n'));
-        continue;
       }
+    } else {
+      // Fix files concurrently; each file is owned by exactly one worker
+      let fixedCount = 0;
+      spinner.start(`Analyzing and applying fix... (0/${fileGroups.length} files)`);
+
+      // The change summary comes from the cached analysis, so a rerun on reverted files
+      // reuses its replies too
+      const replyCache = new FileCache<string>('replies', {
+        ttlMs: REVIEW_CACHE_TTL_MS,
+        maxEntries: REVIEW_CACHE_MAX_ENTRIES,
+        refresh: options.cache === false,
+      });
+
+      const fileOutcomes = await mapConcurrent(
+        fileGroups,
+        config.fixConcurrency,
+        async ([filePath, fileComments]) => {
+          let fileResults: FixResult[];
+          try {
+            fileResults = await codeModifier.applyFixes(
+              filePath,
+              fileComments.map((c) => ({ reviewComment: c.body, lineNumber: c.line || undefined })),
+              prContext
+            );
+          } catch (e) {
+            fileResults = fileComments.map(() => ({
+              success: false,
+              filePath,
+              changesMade: '',
+              error: `Failed to apply fix: ${e}`,
+            }));
+          }
 
-      // Apply fix
-      spinner.start('Analyzing and applying fix...');
+          // Generate replies for preview while other files are still being fixed.
+          // One at a time, so this worker stays a single slot of fixConcurrency
+          const replies: (ReplyOutcome | undefined)[] = [];
+          for (let idx = 0; idx < fileComments.length; idx++) {
+            const comment = fileComments[idx];
+            const result = fileResults[idx];
+            if (!result.success || options.autoReply === false) {
+              replies.push(undefined);
+              continue;
+            }
+            try {
+              const cacheKey = FileCache.key(
+                aiModel.name,
+                aiModel.promptVersion,
+                comment.body,
+                result.changesMade
+              );
+              let reply = await replyCache.get(cacheKey);
+              if (!reply) {
+                reply = await aiModel.generateReply(comment.body, result.changesMade);
+                if (reply) {
+                  await replyCache.set(cacheKey, reply);
+                }
+              }
+              replies.push({ reply });
+            } catch (e) {
+              replies.push({ error: e });
+            }
+          }
 
-      const result = await codeModifier.applyFix(
-        comment.path,
-        comment.body,
-        prContext,
-        comment.line || undefined
+          fixedCount++;
+          spinner.text = `Analyzing and applying fix... (${fixedCount}/${fileGroups.length} files)`;
+          return { fileResults, replies };
+        }
       );
 
       spinner.stop();
-      results.push(result);
 
-      if (result.success) {
-        console.log(chalk.green('✓ Successfully applied fix'));
-        console.log(chalk.dim(result.changesMade));
-        modifiedFiles.push(comment.path);
-
-        // Generate reply for preview
-        if (options.autoReply !== false) {
-          try {
-            const reply = await aiModel.generateReply(comment.body, result.changesMade);
-            pendingReplies.push({ comment, reply, result });
-            console.log(chalk.dim('답변이 생성되었습니다 (나중에 미리보기)'));
-          } catch (e) {
-            console.log(chalk.yellow(`⚠ Failed to generate reply: ${e}`));
+      // Report results grouped by file, in the order the files were first selected
+      fileGroups.forEach(([filePath, fileComments], fileIdx) => {
+        const { fileResults, replies } = fileOutcomes[fileIdx];
+        console.log(chalk.cyan.bold(`File: ${filePath} (${fileComments.length} comment(s))`));
+
+        fileComments.forEach((comment, idx) => {
+          const result = fileResults[idx];
+          const replyOutcome = replies[idx];
+          results.push(result);
+
+          console.log(
+            chalk.bold(`Comment ${selectionNumber.get(comment)}/${selectedComments.length}`)
+          );
+          console.log(chalk.bold(`Line: ${comment.line || '?'}`));
+          console.log(chalk.bold(`Comment: ${comment.body.slice(0, 100)}...`));
+
+          if (result.success) {
+            console.log(chalk.green('✓ Successfully applied fix'));
+            console.log(chalk.dim(result.changesMade));
+            modifiedFiles.add(comment.path);
+
+            if (replyOutcome?.reply !== undefined) {
+              pendingReplies.push({ comment, reply: replyOutcome.reply, result });
+              console.log(chalk.dim('답변이 생성되었습니다 (나중에 미리보기)'));
+            } else if (replyOutcome) {
+              console.log(chalk.yellow(`⚠ Failed to generate reply: ${replyOutcome.error}`));
+            }
+          } else {
+            console.log(chalk.red('✗ Failed to apply fix'));
+            console.log(chalk.red(result.error || 'Unknown error'));
           }
-        }
-      } else {
-        console.log(chalk.red('✗ Failed to apply fix'));
-        console.log(chalk.red(result.error || 'Unknown error'));
-      }
+        });
 
-      console.log();
+        console.log();
+      });
     }
 
     // Reply preview and editing
+    const finalReplies: { comment: ReviewComment; reply: string }[] = [];
+
     if (pendingReplies.length > 0 && !options.dryRun) {
       console.log('\n' + '='.repeat(50));
       console.log(chalk.cyan.bold('답변 미리보기 및 수정\n'));
 
-      const finalReplies: { comment: ReviewComment; reply: string }[] = [];
-
       for (let idx = 0; idx < pendingReplies.length; idx++) {
         const pending = pendingReplies[idx];
         const { comment, reply } = pending;
@@ -387,35 +565,45 @@ async function runFixMode(
           console.log(chalk.yellow('답변이 건너뛰어졌습니다.\n'));
         }
       }
+    }
 
-      // Post all confirmed replies
-      if (finalReplies.length > 0) {
-        console.log(chalk.bold(`\n${finalReplies.length}개의 답변을 게시합니다...`));
+    // Start commit and push now so the push overlaps with posting replies
+    let pushTask: Promise<string> | undefined;
 
-        for (const item of finalReplies) {
-          try {
-            await githubClient.postReviewCommentReply(prUrl, item.comment.id, item.reply);
-            console.log(chalk.green(`✓ Posted reply to ${item.comment.path}:${item.comment.line || '?'}`));
-          } catch (e) {
-            console.log(chalk.yellow(`⚠ Failed to post reply: ${e}`));
-          }
+    if (modifiedFiles.size > 0 && !options.dryRun) {
+      const commitMessage = `fix: Apply review feedback from PR #${prContext.number}\n\nAutomatically applied fixes for ${selectedComments.length} review comment(s)`;
+
+      pushTask = gitOps.commitAndPush([...modifiedFiles], commitMessage);
+      // Failures are reported below, after the replies are posted
+      pushTask.catch(() => {});
+    }
+
+    // Post all confirmed replies
+    if (finalReplies.length > 0) {
+      console.log(chalk.bold(`\n${finalReplies.length}개의 답변을 게시합니다...`));
+
+      for (const item of finalReplies) {
+        try {
+          await githubClient.postReviewCommentReply(prUrl, item.comment.id, item.reply);
+          console.log(chalk.green(`✓ Posted reply to ${item.comment.path}:${item.comment.line || '?'}`));
+        } catch (e) {
+          console.log(chalk.yellow(`⚠ Failed to post reply: ${e}`));
         }
       }
     }
 
-    // Commit and push changes
-    if (modifiedFiles.length > 0 && !options.dryRun) {
+    // Wait for commit and push to finish
+    if (pushTask) {
       console.log(chalk.bold('\nCommitting and pushing changes...'));
 
       try {
-        const uniqueFiles = [...new Set(modifiedFiles)];
-        const commitMessage = `fix: Apply review feedback from PR #${prContext.number}\n\nAutomatically applied fixes for ${selectedComments.length} review comment(s)`;
-
-        const commitSha = await gitOps.commitAndPush(uniqueFiles, commitMessage);
+        const commitSha = await pushTask;
+        githubClient.invalidate(prUrl);
         console.log(chalk.green('✓ Committed and pushed changes'));
         console.log(chalk.dim(`Commit: ${commitSha.slice(0, 7)}`));
       } catch (e) {
         console.log(chalk.red(`✗ Failed to commit/push: ${e}`));
+        await flushCaches();
         process.exit(1);
       }
     }
@@ -437,8 +625,17 @@ async function runFixMode(
   } catch (e) {
     console.error(chalk.red(`\nError: ${e}`));
     console.log();
+    // program.help() exits the process, so write out pending cache entries first
+    await flushCaches();
     program.help();
   }
 }
 
+function firstLinePreview(body: string, maxLength: number): string {
+  // Only look up to the first newline instead of splitting the whole body
+  const newlineIdx = body.indexOf('\n');
+  const firstLine = newlineIdx === -1 ? body : body.slice(0, newlineIdx);
+  return firstLine.length > maxLength ? `${firstLine.slice(0, maxLength)}...` : firstLine;
+}
+
 program.parse();
@@ -1,6 +1,11 @@
-import type { AnalysisResult, PRContext, ReviewSuggestion } from '../types.js';
+import type { AnalysisResult, FixRequest, PRContext, ReviewSuggestion } from '../types.js';
 
 export interface AIModel {
+  // Identifies the underlying model; used to key cached results
+  readonly name: string;
+  // Changes whenever the prompt templates change, so stale cached results are not reused
+  readonly promptVersion: string;
+
   analyzeReview(
     fileContent: string,
     filePath: string,
@@ -15,6 +20,12 @@ export interface AIModel {
     lineNumber?: number
   ): Promise<string>;
 
+  generateCodeFixBatch(
+    fileContent: string,
+    filePath: string,
+    requests: FixRequest[]
+  ): Promise<string>;
+
   generateReply(reviewComment: string, changesMade: string): Promise<string>;
 
   reviewCode(
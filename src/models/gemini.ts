@@ -1,20 +1,97 @@
 import { VertexAI } from '@google-cloud/vertexai';
+import type { GenerativeModel } from '@google-cloud/vertexai';
+import { FileCache } from '../cache.js';
 import { config } from '../config.js';
 import type { AIModel } from './base.js';
-import type { AnalysisResult, PRContext, ReviewSuggestion } from '../types.js';
+import type { AnalysisResult, FixRequest, PRContext, ReviewSuggestion } from '../types.js';
 
-export class GeminiModel implements AIModel {
-  private model;
+const MODEL_ID = 'gemini-2.0-flash-001';
+
+const JSON_FENCE_RE = /```json[^\n]*\n([\s\S]*?)\n```/;
+const CODE_FENCE_RE = /^\s*```[^\n]*\n([\s\S]*?)\n[ \t]*```\s*$/;
+
+// Static prompt text: each prompt is a header, the per-call data, then its output rules
+const ANALYZE_HEADER = `You are a code review assistant. Analyze this review comment and determine what changes need to be made.`;
+
+const ANALYZE_RESPONSE_FORMAT = `Analyze the review and respond in JSON format with:
+{
+    "action": "modify|create|delete|no_action",
+    "reasoning": "explanation of what needs to be done",
+    "changes": ["list of specific changes to make"]
+}`;
+
+const FIX_HEADER = `You are a code review assistant. Fix the code based on this review comment.`;
+
+const FIX_OUTPUT_RULES = `Please provide the COMPLETE fixed file content. Return ONLY the fixed code without any explanation or markdown formatting.`;
+
+const FIX_BATCH_HEADER = `You are a code review assistant. Fix the code based on these review comments.`;
+
+const FIX_BATCH_OUTPUT_RULES = `Please provide the COMPLETE fixed file content that addresses every review comment above. Return ONLY the fixed code without any explanation or markdown formatting.`;
+
+const REPLY_HEADER = `리뷰 코멘트에 대한 간단하고 전문적인 답변을 생성하세요.`;
 
-  constructor() {
+const REPLY_GUIDELINES = `피드백에 감사하고 변경사항을 확인하는 짧은 답변(1-2문장)을 작성하세요.
+전문적이고 간결하게 작성하세요. 마크다운 포맷팅은 사용하지 마세요.
+반드시 한국어로 작성하세요.`;
+
+const REVIEW_HEADER = `당신은 코드 리뷰어입니다. 다음 PR의 변경사항을 검토하고 피드백을 제공하세요.`;
+
+const REVIEW_RUBRIC = `다음 사항들을 검토하세요:
+1. 버그 또는 잠재적 오류
+2. 코드 품질 및 가독성
+3. 성능 문제
+4. 보안 취약점
+5. 베스트 프랙티스
+
+중요: 사소한 스타일 이슈는 무시하고, 실제로 중요한 문제만 지적하세요.
+피드백이 없으면 빈 배열을 반환하세요.
+
+JSON 형식으로 응답하세요:
+{
+  "suggestions": [
+    {
+      "line": <라인 번호 (변경된 라인의 번호, diff에서 + 로 시작하는 라인)>,
+      "body": "<리뷰 코멘트 내용 (한국어로 작성)>"
+    }
+  ]
+}`;
+
+// Bump when the per-call part of a prompt changes; the constants above are hashed in
+const PROMPT_LAYOUT_VERSION = '1';
+const PROMPT_VERSION = FileCache.key(
+  PROMPT_LAYOUT_VERSION,
+  ANALYZE_HEADER,
+  ANALYZE_RESPONSE_FORMAT,
+  FIX_HEADER,
+  FIX_OUTPUT_RULES,
+  FIX_BATCH_HEADER,
+  FIX_BATCH_OUTPUT_RULES,
+  REPLY_HEADER,
+  REPLY_GUIDELINES,
+  REVIEW_HEADER,
+  REVIEW_RUBRIC
+);
+
+// Client setup is shared by every GeminiModel instance in the process
+let sharedModel: GenerativeModel | undefined;
+
+function getGenerativeModel(): GenerativeModel {
+  if (!sharedModel) {
     const vertexAI = new VertexAI({
       project: config.vertexProjectId,
       location: config.vertexLocation,
     });
-    this.model = vertexAI.getGenerativeModel({
-      model: 'gemini-2.0-flash-001',
+    sharedModel = vertexAI.getGenerativeModel({
+      model: MODEL_ID,
     });
   }
+  return sharedModel;
+}
+
+export class GeminiModel implements AIModel {
+  readonly name = MODEL_ID;
+  readonly promptVersion = PROMPT_VERSION;
+  private model = getGenerativeModel();
 
   async analyzeReview(
     fileContent: string,
@@ -22,7 +99,7 @@ export class GeminiModel implements AIModel {
     reviewComment: string,
     prContext: PRContext
   ): Promise<AnalysisResult> {
-    const prompt = `You are a code review assistant. Analyze this review comment and determine what changes need to be made.
+    const prompt = `${ANALYZE_HEADER}
 
 PR Context:
 - Title: ${prContext.title}
@@ -36,25 +113,11 @@ Current File Content:
 ${fileContent}
 \`\`\`
 
-Analyze the review and respond in JSON format with:
-{
-    "action": "modify|create|delete|no_action",
-    "reasoning": "explanation of what needs to be done",
-    "changes": ["list of specific changes to make"]
-}`;
+${ANALYZE_RESPONSE_FORMAT}`;
 
-    const result = await this.model.generateContent(prompt);
-    const text = result.response.candidates?.[0]?.content?.parts?.[0]?.text || '';
-
-    try {
-      const startIdx = text.indexOf('{');
-      const endIdx = text.lastIndexOf('}') + 1;
-      if (startIdx !== -1 && endIdx > startIdx) {
-        const jsonStr = text.slice(startIdx, endIdx);
-        return JSON.parse(jsonStr);
-      }
-    } catch {
-      // ignore parse error
+    const parsed = (await this.generateJson(prompt)) as AnalysisResult | undefined;
+    if (parsed) {
+      return parsed;
     }
 
     return {
@@ -72,7 +135,7 @@ Analyze the review and respond in JSON format with:
   ): Promise<string> {
     const lineInfo = lineNumber ? `at line ${lineNumber}` : '';
 
-    const prompt = `You are a code review assistant. Fix the code based on this review comment.
+    const prompt = `${FIX_HEADER}
 
 File: ${filePath} ${lineInfo}
 Review Comment: ${reviewComment}
@@ -82,34 +145,48 @@ Current File Content:
 ${fileContent}
 \`\`\`
 
-Please provide the COMPLETE fixed file content. Return ONLY the fixed code without any explanation or markdown formatting.`;
+${FIX_OUTPUT_RULES}`;
 
     const result = await this.model.generateContent(prompt);
-    let fixedCode = result.response.candidates?.[0]?.content?.parts?.[0]?.text || '';
-    fixedCode = fixedCode.trim();
-
-    // Remove markdown code blocks if present
-    if (fixedCode.startsWith('```')) {
-      const lines = fixedCode.split('\n');
-      lines.shift(); // Remove first line (```language)
-      if (lines[lines.length - 1]?.trim() === '```') {
-        lines.pop(); // Remove last line (```)
-      }
-      fixedCode = lines.join('\n');
-    }
+    return stripCodeFence(result.response.candidates?.[0]?.content?.parts?.[0]?.text || '');
+  }
 
-    return fixedCode;
+  async generateCodeFixBatch(
+    fileContent: string,
+    filePath: string,
+    requests: FixRequest[]
+  ): Promise<string> {
+    const commentList = requests
+      .map((r, idx) => {
+        const lineInfo = r.lineNumber ? ` (line ${r.lineNumber})` : '';
+        return `${idx + 1}.${lineInfo} ${r.reviewComment}`;
+      })
+      .join('\n');
+
+    const prompt = `${FIX_BATCH_HEADER}
+
+File: ${filePath}
+Review Comments:
+${commentList}
+
+Current File Content:
+\`\`\`
+${fileContent}
+\`\`\`
+
+${FIX_BATCH_OUTPUT_RULES}`;
+
+    const result = await this.model.generateContent(prompt);
+    return stripCodeFence(result.response.candidates?.[0]?.content?.parts?.[0]?.text || '');
   }
 
   async generateReply(reviewComment: string, changesMade: string): Promise<string> {
-    const prompt = `리뷰 코멘트에 대한 간단하고 전문적인 답변을 생성하세요.
+    const prompt = `${REPLY_HEADER}
 
 리뷰 코멘트: ${reviewComment}
 적용된 변경사항: ${changesMade}
 
-피드백에 감사하고 변경사항을 확인하는 짧은 답변(1-2문장)을 작성하세요.
-전문적이고 간결하게 작성하세요. 마크다운 포맷팅은 사용하지 마세요.
-반드시 한국어로 작성하세요.`;
+${REPLY_GUIDELINES}`;
 
     const result = await this.model.generateContent(prompt);
     return result.response.candidates?.[0]?.content?.parts?.[0]?.text?.trim() || '';
@@ -120,7 +197,7 @@ Please provide the COMPLETE fixed file content. Return ONLY the fixed code witho
     patch: string,
     prContext: PRContext
   ): Promise<ReviewSuggestion[]> {
-    const prompt = `당신은 코드 리뷰어입니다. 다음 PR의 변경사항을 검토하고 피드백을 제공하세요.
+    const prompt = `${REVIEW_HEADER}
 
 PR 정보:
 - 제목: ${prContext.title}
@@ -132,37 +209,16 @@ PR 정보:
 ${patch}
 \`\`\`
 
-다음 사항들을 검토하세요:
-1. 버그 또는 잠재적 오류
-2. 코드 품질 및 가독성
-3. 성능 문제
-4. 보안 취약점
-5. 베스트 프랙티스
-
-중요: 사소한 스타일 이슈는 무시하고, 실제로 중요한 문제만 지적하세요.
-피드백이 없으면 빈 배열을 반환하세요.
-
-JSON 형식으로 응답하세요:
-{
-  "suggestions": [
-    {
-      "line": <라인 번호 (변경된 라인의 번호, diff에서 + 로 시작하는 라인)>,
-      "body": "<리뷰 코멘트 내용 (한국어로 작성)>"
-    }
-  ]
-}
+${REVIEW_RUBRIC}
 
 반드시 유효한 JSON만 출력하세요.`;
 
-    const result = await this.model.generateContent(prompt);
-    const text = result.response.candidates?.[0]?.content?.parts?.[0]?.text || '';
+    const parsed = (await this.generateJson(prompt)) as
+      | { suggestions?: { line: number; body: string }[] }
+      | undefined;
 
     try {
-      const startIdx = text.indexOf('{');
-      const endIdx = text.lastIndexOf('}') + 1;
-      if (startIdx !== -1 && endIdx > startIdx) {
-        const jsonStr = text.slice(startIdx, endIdx);
-        const parsed = JSON.parse(jsonStr);
+      if (parsed) {
         const suggestions: ReviewSuggestion[] = (parsed.suggestions || []).map(
           (s: { line: number; body: string }) => ({
             path: filePath,
@@ -179,4 +235,97 @@ JSON 형식으로 응답하세요:
 
     return [];
   }
+
+  // Stream the response and stop reading once a complete JSON object has arrived,
+  // so any commentary the model appends after it is never waited for
+  private async generateJson(prompt: string): Promise<unknown> {
+    const result = await this.model.generateContentStream(prompt);
+    // The aggregated response is abandoned on early stop; keep its rejection quiet
+    result.response.catch(() => {});
+
+    let text = '';
+    let objectStart = 0;
+    let depth = 0;
+    let inString = false;
+    let escaped = false;
+
+    for await (const chunk of result.stream) {
+      const part = chunk.candidates?.[0]?.content?.parts?.[0]?.text || '';
+
+      for (let i = 0; i < part.length; i++) {
+        const ch = part[i];
+        if (inString) {
+          if (escaped) {
+            escaped = false;
+          } else if (ch === '\\') {
+            escaped = true;
+          } else if (ch === '"') {
+            inString = false;
+          }
+        } else if (ch === '"') {
+          // Quotes in prose before the object are not JSON strings
+          inString = depth > 0;
+        } else if (ch === '{') {
+          if (depth++ === 0) {
+            objectStart = text.length + i;
+          }
+        } else if (ch === '}' && depth > 0 && --depth === 0) {
+          // Prose such as `{x}` balances too, so only stop on an object that parses
+          try {
+            return JSON.parse((text + part.slice(0, i + 1)).slice(objectStart));
+          } catch {
+            // keep reading; the full text is parsed below if nothing else matches
+          }
+        }
+      }
+
+      text += part;
+    }
+
+    return parseJsonObject(text);
+  }
+}
+
+function parseJsonObject(text: string): unknown {
+  // Prefer an explicit ```json block; otherwise take the outermost braces
+  const fenced = JSON_FENCE_RE.exec(text);
+  const candidate = fenced ? fenced[1] : text;
+
+  const startIdx = candidate.indexOf('{');
+  const endIdx = candidate.lastIndexOf('}') + 1;
+  if (startIdx === -1 || endIdx <= startIdx) {
+    return undefined;
+  }
+
+  try {
+    return JSON.parse(candidate.slice(startIdx, endIdx));
+  } catch {
+    return undefined;
+  }
+}
+
+function stripCodeFence(text: string): string {
+  // Match the fence on the raw response so the common case needs no trimmed copy
+  const match = CODE_FENCE_RE.exec(text);
+  if (match) {
+    return match[1];
+  }
+
+  const code = text.trim();
+  if (!code.startsWith('```')) {
+    return code;
+  }
+
+  // Fallback for fences the regex rejects (bare opening line, empty block):
+  // drop the ```language line and a closing ``` line, as a line-based strip would
+  const firstNewline = code.indexOf('\n');
+  if (firstNewline === -1) {
+    return '';
+  }
+  const body = code.slice(firstNewline + 1);
+  const lastNewline = body.lastIndexOf('\n');
+  if (body.slice(lastNewline + 1).trim() === '```') {
+    return lastNewline === -1 ? '' : body.slice(0, lastNewline);
+  }
+  return body;
 }
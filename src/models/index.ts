@@ -1,16 +1,23 @@
 import type { AIModel } from './base.js';
-import { GeminiModel } from './gemini.js';
-import { config } from '../config.js';
+import { config, isModelName } from '../config.js';
+import type { ModelName } from '../config.js';
 
-export function getModel(): AIModel {
+// Provider SDKs are imported on demand so only the selected one is loaded
+const MODEL_FACTORIES: Record<ModelName, () => Promise<AIModel>> = {
+  gemini: async () => {
+    const { GeminiModel } = await import('./gemini.js');
+    return new GeminiModel();
+  },
+};
+
+export async function getModel(): Promise<AIModel> {
   const modelName = config.defaultModel;
 
-  switch (modelName) {
-    case 'gemini':
-      return new GeminiModel();
-    default:
-      throw new Error(`Unknown model: ${modelName}`);
+  if (!isModelName(modelName)) {
+    throw new Error(`Unknown model: ${modelName}`);
   }
+
+  return MODEL_FACTORIES[modelName]();
 }
 
 export type { AIModel };
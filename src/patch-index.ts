@@ -0,0 +1,75 @@
+import type { PRFile } from './types.js';
+
+// Sticky: matched in place at a line offset without slicing the patch
+const HUNK_HEADER_RE = /@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))?/y;
+
+export class PatchIndex {
+  private patches = new Map<string, string>();
+  private validLinesByPath = new Map<string, ReadonlySet<number>>();
+
+  static fromFiles(files: PRFile[]): PatchIndex {
+    const index = new PatchIndex();
+    for (const file of files) {
+      if (file.patch) {
+        index.patches.set(file.filename, file.patch);
+      }
+    }
+    return index;
+  }
+
+  validLines(filePath: string): ReadonlySet<number> {
+    // Parsed on first use, then shared by every later lookup for the same file
+    let lines = this.validLinesByPath.get(filePath);
+    if (!lines) {
+      const patch = this.patches.get(filePath);
+      lines = patch ? parsePatchLines(patch) : new Set<number>();
+      this.validLinesByPath.set(filePath, lines);
+    }
+    return lines;
+  }
+
+  isValidLine(filePath: string, line: number): boolean {
+    return this.validLines(filePath).has(line);
+  }
+}
+
+export function parsePatchLines(patch: string): Set<number> {
+  // Lines on the new (RIGHT) side of the diff that GitHub accepts review comments on
+  const validLines = new Set<number>();
+  let currentLine = 0;
+  let pos = 0;
+
+  // Walk line offsets in place rather than materializing patch.split('\n')
+  while (pos < patch.length) {
+    let end = patch.indexOf('\n', pos);
+    if (end === -1) {
+      end = patch.length;
+    }
+
+    const marker = patch[pos];
+    if (marker === '+' || marker === ' ') {
+      validLines.add(currentLine++);
+    } else if (marker === '@') {
+      HUNK_HEADER_RE.lastIndex = pos;
+      const match = HUNK_HEADER_RE.exec(patch);
+      if (match) {
+        currentLine = parseInt(match[2], 10);
+
+        // A hunk without old lines (new file) is all additions: take the range from the header
+        if (match[1] === '0') {
+          const count = match[3] === undefined ? 1 : parseInt(match[3], 10);
+          for (let i = 0; i < count; i++) {
+            validLines.add(currentLine++);
+          }
+          const nextHunk = patch.indexOf('\n@@', end);
+          end = nextHunk === -1 ? patch.length : nextHunk;
+        }
+      }
+    }
+    // '-' lines only exist on the old side; a leading backslash marks "No newline at end of file"
+
+    pos = end + 1;
+  }
+
+  return validLines;
+}
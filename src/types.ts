@@ -29,6 +29,11 @@ export interface FixResult {
   reasoning?: string;
 }
 
+export interface FixRequest {
+  reviewComment: string;
+  lineNumber?: number;
+}
+
 export interface AnalysisResult {
   action: 'modify' | 'create' | 'delete' | 'no_action';
   reasoning: string;